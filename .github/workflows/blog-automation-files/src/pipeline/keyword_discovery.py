@@ -5,161 +5,419 @@ Keyword Discovery Module
 Discovers low-competition keywords related to a given seed topic using free SEO APIs.
 """
 
-import requests
+import asyncio
+import hashlib
 import logging
-import time
 import json
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger("blog-automation.keyword_discovery")
 
+# Simulated keyword providers, tried in this order of preference. Query and
+# URL templates are filled by _template_fields(): {t} is the raw topic and
+# {dashed}/{underscored}/{encoded} are the topic with spaces replaced for URLs.
+_PROVIDERS = {
+    "serpapi": {
+        "label": "SerpAPI",
+        "queries": (
+            "{t} best practices",
+            "{t} examples",
+            "how to {t}",
+            "{t} tutorial",
+            "{t} for beginners"
+        ),
+        "urls": (
+            "https://example.com/{dashed}-guide",
+            "https://example.org/learn-{dashed}",
+            "https://tutorial.com/{underscored}_101"
+        ),
+        "metrics": {
+            "search_volume": 1200,
+            "cpc": 0.75,
+            "competition": 0.65
+        },
+        "source": "serpapi_simulation"
+    },
+    "keywordsurfer": {
+        "label": "KeywordSurfer",
+        "queries": (
+            "{t} guide",
+            "best {t} practices",
+            "{t} tips and tricks",
+            "{t} for professionals",
+            "advanced {t}"
+        ),
+        "urls": (
+            "https://guide.com/complete-{dashed}-guide",
+            "https://blog.example.com/mastering-{dashed}",
+            "https://academy.example.org/{underscored}_masterclass"
+        ),
+        "metrics": {
+            "search_volume": 980,
+            "cpc": 0.82,
+            "competition": 0.58
+        },
+        "source": "keywordsurfer_simulation"
+    },
+    "google_trends": {
+        "label": "Google Trends",
+        "queries": (
+            "{t} 2025",
+            "latest {t} trends",
+            "{t} innovations",
+            "future of {t}",
+            "{t} industry insights"
+        ),
+        "urls": (
+            "https://trends.google.com/trends/explore?q={encoded}",
+            "https://news.example.com/{dashed}-trends-2025",
+            "https://research.example.org/future-of-{dashed}"
+        ),
+        "metrics": {
+            "search_volume": 850,
+            "cpc": 0.65,
+            "competition": 0.72
+        },
+        "source": "google_trends_simulation"
+    }
+}
+
+
+def _dump_json(data):
+    """Serialize data to indented JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def _load_json(raw):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _template_fields(topic):
+    """Return the substitution fields used by the query and URL templates."""
+    return {
+        "t": topic,
+        "dashed": topic.replace(' ', '-'),
+        "underscored": topic.replace(' ', '_'),
+        "encoded": topic.replace(' ', '%20')
+    }
+
+
+def _cache_key(topic):
+    """
+    Return a stable, filesystem-safe cache key for a topic.
+    
+    The topic is hashed exactly as given, because the cached data embeds it
+    verbatim in the primary keyword, queries and URLs.
+    """
+    return hashlib.blake2b(topic.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _read_digest(path):
+    """Return the digest stored in a cache sidecar file, or None if it is missing."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode("ascii").strip()
+    except FileNotFoundError:
+        return None
+
+
+def _atomic_write(path, data):
+    """Write bytes to path via a temp file and rename so readers never see a partial file."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        except FileNotFoundError:
+            # The cache directory was removed after this process created it
+            os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RateLimiter:
+    """Token-bucket rate limiter for a single API provider."""
+    
+    def __init__(self, rate=1.0, capacity=None):
+        """
+        Initialize the bucket.
+        
+        Args:
+            rate (float): Tokens added per second
+            capacity (float, optional): Maximum burst size, defaults to max(rate, 1)
+            
+        Raises:
+            ValueError: If rate is not positive
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate limit must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        
+    async def acquire(self, n=1):
+        """
+        Wait until n tokens are available, then consume them.
+        
+        Raises:
+            ValueError: If n exceeds the bucket capacity, since it could never be satisfied
+        """
+        if n > self.capacity:
+            raise ValueError(f"Cannot acquire {n} tokens from a bucket of capacity {self.capacity}")
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            await asyncio.sleep((n - self.tokens) / self.rate)
+
+
 class KeywordDiscovery:
     """Discovers keywords using free SEO APIs."""
     
+    __slots__ = ("config", "cache_dir", "_mem_cache", "_limiters")
+    
+    # In-memory (digest, serialized keyword data) pairs shared by every instance
+    # using the same cache_dir
+    _mem_caches = {}
+    _MEM_CACHE_SIZE = 512
+    
+    # Cache directories already created in this process
+    _ensured_dirs = set()
+    
+    _FALLBACK_TEMPLATES = (
+        "{t} guide",
+        "how to {t}",
+        "best {t} practices",
+        "{t} examples",
+        "{t} tutorial",
+        "{t} for beginners",
+        "advanced {t}",
+        "{t} tips",
+        "{t} 2025",
+        "{t} tools"
+    )
+    
     def __init__(self, config=None):
         """Initialize with configuration."""
         self.config = config or {}
-        self.cache_dir = self.config.get("cache_dir", "cache/keywords")
-        os.makedirs(self.cache_dir, exist_ok=True)
+        self.cache_dir = Path(self.config.get("cache_dir", "cache/keywords"))
+        resolved_dir = self.cache_dir.resolve()
+        if resolved_dir not in KeywordDiscovery._ensured_dirs:
+            os.makedirs(resolved_dir, exist_ok=True)
+            KeywordDiscovery._ensured_dirs.add(resolved_dir)
+        self._mem_cache = KeywordDiscovery._mem_caches.setdefault(resolved_dir, OrderedDict())
+        # Only providers with a configured rate are limited
+        rate_limits = self.config.get("rate_limits") or {}
+        self._limiters = {
+            name: RateLimiter(rate=rate_limits[name])
+            for name in _PROVIDERS
+            if rate_limits.get(name) is not None
+        }
         
     def discover(self, topic):
         """
         Discover keywords related to the given topic.
         
+        Synchronous wrapper around discover_async() for callers that are not
+        running an event loop. Cached topics are answered without starting one.
+        
         Args:
             topic (str): The seed topic to find keywords for
             
         Returns:
             dict: Keyword data including primary keyword, related queries, and top URLs
         """
-        # Check cache first
-        cache_file = os.path.join(self.cache_dir, f"{topic.replace(' ', '_')}.json")
-        if os.path.exists(cache_file):
-            logger.info(f"Using cached keyword data for '{topic}'")
-            with open(cache_file, 'r') as f:
-                return json.load(f)
+        result = self._read_cache(topic)
+        if result is None:
+            result = asyncio.run(self._discover_uncached(topic))
+        return result
         
-        logger.info(f"Discovering keywords for topic: {topic}")
+    async def discover_async(self, topic):
+        """
+        Discover keywords related to the given topic.
         
-        # Try multiple free APIs in sequence until one works
-        result = None
+        Queries all providers concurrently and uses the first successful response.
         
-        # Try SerpAPI free tier
-        try:
-            result = self._try_serpapi(topic)
-        except Exception as e:
-            logger.warning(f"SerpAPI failed: {e}")
+        Args:
+            topic (str): The seed topic to find keywords for
+            
+        Returns:
+            dict: Keyword data including primary keyword, related queries, and top URLs
+        """
+        result = self._read_cache(topic)
+        if result is None:
+            result = await self._discover_uncached(topic)
+        return result
+    
+    def _cache_paths(self, topic):
+        """Return the cache key, data file and digest sidecar file for a topic."""
+        key = _cache_key(topic)
+        return key, self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.sha256"
+    
+    def _read_cache(self, topic):
+        """Return cached keyword data for a topic, or None if it is not cached."""
+        # Check the in-memory cache first; an entry is only reused while its
+        # digest still matches the sidecar file next to the disk cache entry
+        key, cache_file, hash_file = self._cache_paths(topic)
+        disk_digest = _read_digest(hash_file)
+        cached = self._mem_cache.get(key)
+        if cached and disk_digest is not None and cached[0] == disk_digest:
+            logger.info("Using in-memory keyword data for '%s'", topic)
+            self._mem_cache.move_to_end(key)
+            return _load_json(cached[1])
         
-        # Try KeywordSurfer API if SerpAPI failed
-        if not result:
-            try:
-                result = self._try_keywordsurfer(topic)
-            except Exception as e:
-                logger.warning(f"KeywordSurfer failed: {e}")
+        if cache_file.exists():
+            logger.info("Using cached keyword data for '%s'", topic)
+            with open(cache_file, 'rb') as f:
+                raw = f.read()
+            result = _load_json(raw)
+            digest = hashlib.sha256(raw).hexdigest()
+            if disk_digest != digest:
+                _atomic_write(hash_file, digest.encode("ascii"))
+            self._remember(key, digest, raw)
+            return result
         
-        # Try Google Trends API as last resort
-        if not result:
-            try:
-                result = self._try_google_trends(topic)
-            except Exception as e:
-                logger.warning(f"Google Trends failed: {e}")
+        return None
+    
+    async def _discover_uncached(self, topic):
+        """Query all providers for a topic and cache the first successful response."""
+        key, cache_file, hash_file = self._cache_paths(topic)
+        logger.info("Discovering keywords for topic: %s", topic)
+        
+        # Query all free APIs in parallel and keep the first one that works
+        pending = {
+            asyncio.create_task(self._try_provider(name, topic)): provider["label"]
+            for name, provider in _PROVIDERS.items()
+        }
+        result = None
+        try:
+            while pending and not result:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Walk finished tasks in provider order so ties keep the old preference
+                for task in [t for t in pending if t in done]:
+                    name = pending.pop(task)
+                    try:
+                        result = result or task.result()
+                    except Exception as e:
+                        logger.warning("%s failed: %s", name, e)
+        finally:
+            # Cancel providers that are still running once we have a result
+            for task in pending:
+                task.cancel()
                 
         # If all APIs failed, use fallback method
         if not result:
             logger.warning("All APIs failed, using fallback method")
             result = self._fallback_method(topic)
             
-        # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(result, f, indent=2)
+        # Cache the results along with a digest sidecar
+        data = _dump_json(result)
+        digest = hashlib.sha256(data).hexdigest()
+        _atomic_write(cache_file, data)
+        _atomic_write(hash_file, digest.encode("ascii"))
+        self._remember(key, digest, data)
             
         return result
     
-    def _try_serpapi(self, topic):
-        """Try using SerpAPI free tier."""
-        # This would use the actual SerpAPI in a real implementation
-        # For now, we'll simulate the response
+    async def discover_many(self, topics, concurrency=None):
+        """
+        Discover keywords for several topics concurrently.
         
-        logger.info("Using SerpAPI for keyword discovery")
-        time.sleep(1)  # Simulate API call
+        All lookups share this instance's rate limiters.
         
-        return {
-            "primary_keyword": topic,
-            "related_queries": [
-                f"{topic} best practices",
-                f"{topic} examples",
-                f"how to {topic}",
-                f"{topic} tutorial",
-                f"{topic} for beginners"
-            ],
-            "top_urls": [
-                f"https://example.com/{topic.replace(' ', '-')}-guide",
-                f"https://example.org/learn-{topic.replace(' ', '-')}",
-                f"https://tutorial.com/{topic.replace(' ', '_')}_101"
-            ],
-            "metrics": {
-                "search_volume": 1200,
-                "cpc": 0.75,
-                "competition": 0.65
-            },
-            "source": "serpapi_simulation"
-        }
-    
-    def _try_keywordsurfer(self, topic):
-        """Try using KeywordSurfer API."""
-        # This would use the actual KeywordSurfer API in a real implementation
-        logger.info("Using KeywordSurfer for keyword discovery")
-        time.sleep(1)  # Simulate API call
+        Args:
+            topics (list): The seed topics to find keywords for
+            concurrency (int, optional): Maximum topics in flight, defaults to
+                the max_concurrency config value
+            
+        Returns:
+            dict: Keyword data keyed by topic; topics whose discovery failed are
+                logged and left out
+            
+        Raises:
+            ValueError: If the concurrency limit is less than 1
+        """
+        if concurrency is None:
+            concurrency = self.config.get("max_concurrency", 5)
+        if concurrency < 1:
+            raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+        semaphore = asyncio.Semaphore(concurrency)
         
-        return {
-            "primary_keyword": topic,
-            "related_queries": [
-                f"{topic} guide",
-                f"best {topic} practices",
-                f"{topic} tips and tricks",
-                f"{topic} for professionals",
-                f"advanced {topic}"
-            ],
-            "top_urls": [
-                f"https://guide.com/complete-{topic.replace(' ', '-')}-guide",
-                f"https://blog.example.com/mastering-{topic.replace(' ', '-')}",
-                f"https://academy.example.org/{topic.replace(' ', '_')}_masterclass"
-            ],
-            "metrics": {
-                "search_volume": 980,
-                "cpc": 0.82,
-                "competition": 0.58
-            },
-            "source": "keywordsurfer_simulation"
-        }
+        async def bounded_discover(topic):
+            async with semaphore:
+                return await self.discover_async(topic)
+        
+        results = await asyncio.gather(
+            *(bounded_discover(topic) for topic in topics),
+            return_exceptions=True
+        )
+        discovered = {}
+        for topic, result in zip(topics, results):
+            if isinstance(result, Exception):
+                logger.warning("Keyword discovery failed for '%s': %s", topic, result)
+            else:
+                discovered[topic] = result
+        return discovered
+    
+    def _remember(self, key, digest, data):
+        """
+        Store serialized keyword data and its file digest in the in-memory cache,
+        evicting the least recently used entry when full. Hits decode a fresh dict from the
+        bytes, so callers never share state with the cache.
+        """
+        self._mem_cache[key] = (digest, data)
+        self._mem_cache.move_to_end(key)
+        if len(self._mem_cache) > self._MEM_CACHE_SIZE:
+            self._mem_cache.popitem(last=False)
     
-    def _try_google_trends(self, topic):
-        """Try using Google Trends API."""
-        # This would use the actual Google Trends API in a real implementation
-        logger.info("Using Google Trends for keyword discovery")
-        time.sleep(1)  # Simulate API call
+    async def _simulate_latency(self):
+        """Sleep for the configured simulate_latency seconds, if any, to mimic an API call."""
+        delay = self.config.get("simulate_latency", 0)
+        if delay:
+            await asyncio.sleep(delay)
+    
+    async def _try_provider(self, name, topic):
+        """Try using the named keyword provider from _PROVIDERS."""
+        # This would call the provider's actual API in a real implementation
+        # For now, we'll simulate the response
+        provider = _PROVIDERS[name]
+        
+        logger.info("Using %s for keyword discovery", provider["label"])
+        limiter = self._limiters.get(name)
+        if limiter is not None:
+            await limiter.acquire()
+        await self._simulate_latency()
         
+        fields = _template_fields(topic)
         return {
             "primary_keyword": topic,
-            "related_queries": [
-                f"{topic} 2025",
-                f"latest {topic} trends",
-                f"{topic} innovations",
-                f"future of {topic}",
-                f"{topic} industry insights"
-            ],
-            "top_urls": [
-                f"https://trends.google.com/trends/explore?q={topic.replace(' ', '%20')}",
-                f"https://news.example.com/{topic.replace(' ', '-')}-trends-2025",
-                f"https://research.example.org/future-of-{topic.replace(' ', '-')}"
-            ],
-            "metrics": {
-                "search_volume": 850,
-                "cpc": 0.65,
-                "competition": 0.72
-            },
-            "source": "google_trends_simulation"
+            "related_queries": [tpl.format_map(fields) for tpl in provider["queries"]],
+            "top_urls": [tpl.format_map(fields) for tpl in provider["urls"]],
+            "metrics": dict(provider["metrics"]),
+            "source": provider["source"]
         }
     
     def _fallback_method(self, topic):
@@ -167,18 +425,7 @@ class KeywordDiscovery:
         logger.info("Using fallback method for keyword discovery")
         
         # Generate some basic keywords based on common patterns
-        related_queries = [
-            f"{topic} guide",
-            f"how to {topic}",
-            f"best {topic} practices",
-            f"{topic} examples",
-            f"{topic} tutorial",
-            f"{topic} for beginners",
-            f"advanced {topic}",
-            f"{topic} tips",
-            f"{topic} 2025",
-            f"{topic} tools"
-        ]
+        related_queries = [tpl.format(t=topic) for tpl in self._FALLBACK_TEMPLATES]
         
         return {
             "primary_keyword": topic,
@@ -8,108 +8,167 @@ This script orchestrates the full blogging pipeline from keyword discovery to pu
 import os
 import sys
 import argparse
+import asyncio
+import copy
+import functools
+import importlib
 import logging
+import logging.handlers
 import json
 import yaml
 from datetime import datetime
 
-# Configure logging
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# Configure logging; file records are buffered and flushed in batches,
+# on errors, and at exit
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_log_file_handler = logging.FileHandler("pipeline.log")
+_log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler("pipeline.log"),
+        logging.handlers.MemoryHandler(
+            capacity=1024,
+            flushLevel=logging.ERROR,
+            target=_log_file_handler
+        ),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger("blog-automation")
 
+
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(path, mtime):
+    """Parse a YAML file; results are cached until the file's mtime changes."""
+    with open(path, 'r') as file:
+        return yaml.load(file, Loader=YamlLoader)
+
 class BlogPipeline:
     """Main pipeline controller for the autonomous blogging system."""
     
+    __slots__ = ("config", "modules")
+    
+    # Stage name -> (module path, class name, config section)
+    _MODULE_SPECS = {
+        "keyword": ("pipeline.keyword_discovery", "KeywordDiscovery", "keyword_discovery"),
+        "content": ("pipeline.content_creation", "ContentCreation", "content_creation"),
+        "grammar": ("pipeline.grammar_check", "GrammarStyleChecker", "grammar_check"),
+        "visual": ("pipeline.visual_generator", "VisualGenerator", "visual_generator"),
+        "publish": ("pipeline.publisher", "Publisher", "publisher"),
+        "monetize": ("pipeline.monetization", "MonetizationManager", "monetization"),
+        "social": ("pipeline.social_promotion", "SocialPromotion", "social_promotion"),
+        "email": ("pipeline.email_drafter", "EmailDrafter", "email_drafter"),
+        "analytics": ("pipeline.analytics", "AnalyticsTracker", "analytics"),
+    }
+    
     def __init__(self, config_path="config.yaml"):
         """Initialize the pipeline with configuration."""
         self.config = self._load_config(config_path)
         self.modules = {}
-        self._load_modules()
         
     def _load_config(self, config_path):
         """Load configuration from YAML file."""
         try:
-            with open(config_path, 'r') as file:
-                return yaml.safe_load(file)
+            path = os.path.abspath(config_path)
+            # Copy so modules can't alter the config cached for later pipelines
+            return copy.deepcopy(_load_yaml_cached(path, os.path.getmtime(path)))
         except Exception as e:
-            logger.error(f"Failed to load config: {e}")
+            logger.error("Failed to load config: %s", e)
             return {}
             
-    def _load_modules(self):
-        """Load all pipeline modules."""
-        try:
-            # Import modules dynamically
-            from pipeline.keyword_discovery import KeywordDiscovery
-            from pipeline.content_creation import ContentCreation
-            from pipeline.grammar_check import GrammarStyleChecker
-            from pipeline.visual_generator import VisualGenerator
-            from pipeline.publisher import Publisher
-            from pipeline.monetization import MonetizationManager
-            from pipeline.social_promotion import SocialPromotion
-            from pipeline.email_drafter import EmailDrafter
-            from pipeline.analytics import AnalyticsTracker
-            
-            # Initialize modules
-            self.modules["keyword"] = KeywordDiscovery(self.config.get("keyword_discovery", {}))
-            self.modules["content"] = ContentCreation(self.config.get("content_creation", {}))
-            self.modules["grammar"] = GrammarStyleChecker(self.config.get("grammar_check", {}))
-            self.modules["visual"] = VisualGenerator(self.config.get("visual_generator", {}))
-            self.modules["publish"] = Publisher(self.config.get("publisher", {}))
-            self.modules["monetize"] = MonetizationManager(self.config.get("monetization", {}))
-            self.modules["social"] = SocialPromotion(self.config.get("social_promotion", {}))
-            self.modules["email"] = EmailDrafter(self.config.get("email_drafter", {}))
-            self.modules["analytics"] = AnalyticsTracker(self.config.get("analytics", {}))
-            
-            logger.info("All modules loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load modules: {e}")
+    def _get(self, name):
+        """Return the module for a pipeline stage, importing it on first use."""
+        if name not in self.modules:
+            module_path, class_name, config_key = self._MODULE_SPECS[name]
+            module_class = getattr(importlib.import_module(module_path), class_name)
+            self.modules[name] = module_class(self.config.get(config_key, {}))
+            logger.info("Loaded %s module", class_name)
+        return self.modules[name]
             
     def run(self, topic):
         """Run the full pipeline with the given topic."""
-        logger.info(f"Starting pipeline for topic: {topic}")
+        return asyncio.run(self.run_async(topic))
+    
+    def run_many(self, topics):
+        """Run the full pipeline for each of the given topics."""
+        return asyncio.run(self.run_many_async(topics))
+    
+    async def run_many_async(self, topics):
+        """
+        Run the full pipeline for each of the given topics.
+        
+        Keyword discovery for all topics is done up front in one concurrent
+        batch; the remaining stages then run topic by topic.
+        """
+        # Duplicate topics would publish the same post twice
+        topics = list(dict.fromkeys(topics))
+        
+        try:
+            await self._get("keyword").discover_many(topics)
+        except Exception as e:
+            logger.warning("Batch keyword discovery failed: %s", e)
+        
+        results = {}
+        for topic in topics:
+            results[topic] = await self.run_async(topic)
+        return results
+    
+    async def _call(self, func, *args):
+        """Run a blocking module call in the default thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+        
+    async def run_async(self, topic):
+        """
+        Run the full pipeline with the given topic.
+        
+        Independent stages run concurrently: grammar checking overlaps with
+        visual generation, and social promotion, email drafting and analytics
+        setup run together once the post is published and monetized.
+        """
+        logger.info("Starting pipeline for topic: %s", topic)
         
         try:
             # 1. Keyword Discovery
-            keywords = self.modules["keyword"].discover(topic)
-            logger.info(f"Keywords discovered: {keywords}")
+            keywords = await self._get("keyword").discover_async(topic)
+            logger.info("Keywords discovered for: %s", keywords.get("primary_keyword", topic))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Keyword data: %s", json.dumps(keywords))
             
             # 2. Content Creation
-            content = self.modules["content"].create(keywords)
+            content = await self._call(self._get("content").create, keywords)
             logger.info("Content created successfully")
             
-            # 3. Grammar & Style Check
-            content = self.modules["grammar"].check(content)
+            # 3-4. Grammar & Style Check alongside Visual Generation
+            content, images = await asyncio.gather(
+                self._call(self._get("grammar").check, content),
+                self._call(self._get("visual").generate, content)
+            )
             logger.info("Grammar and style check completed")
-            
-            # 4. Visual Generation
-            images = self.modules["visual"].generate(content)
-            logger.info(f"Generated {len(images)} images")
+            logger.info("Generated %d images", len(images))
             
             # 5. Publishing
-            url = self.modules["publish"].publish(content, images)
-            logger.info(f"Published to: {url}")
+            url = await self._call(self._get("publish").publish, content, images)
+            logger.info("Published to: %s", url)
             
             # 6. Monetization
-            monetized_content = self.modules["monetize"].apply(content, url)
+            monetized_content = await self._call(self._get("monetize").apply, content, url)
             logger.info("Monetization applied")
             
-            # 7. Social Promotion
-            social_posts = self.modules["social"].promote(url, content)
-            logger.info(f"Created {len(social_posts)} social media posts")
-            
-            # 8. Email Draft
-            email_draft = self.modules["email"].draft(url, content)
+            # 7-9. Social Promotion, Email Draft and Analytics Setup
+            social_posts, email_draft, _ = await asyncio.gather(
+                self._call(self._get("social").promote, url, content),
+                self._call(self._get("email").draft, url, content),
+                self._call(self._get("analytics").setup_tracking, url)
+            )
+            logger.info("Created %d social media posts", len(social_posts))
             logger.info("Email newsletter draft created")
-            
-            # 9. Analytics Setup
-            self.modules["analytics"].setup_tracking(url)
             logger.info("Analytics tracking configured")
             
             return {
@@ -120,23 +179,38 @@ class BlogPipeline:
             }
             
         except Exception as e:
-            logger.error(f"Pipeline failed: {e}")
+            logger.error("Pipeline failed: %s", e)
             return {
                 "status": "error",
                 "message": str(e)
             }
 
+def _print_json(data):
+    """Print data as JSON, pretty-printed only when stdout is a terminal."""
+    indent = 2 if sys.stdout.isatty() else None
+    print(json.dumps(data, indent=indent))
+
 def main():
     """Main entry point for the pipeline script."""
     parser = argparse.ArgumentParser(description="Run the autonomous blogging pipeline")
-    parser.add_argument("topic", help="The blog topic to process")
+    topic_group = parser.add_mutually_exclusive_group(required=True)
+    topic_group.add_argument("topic", nargs="?", help="The blog topic to process")
+    topic_group.add_argument("--topics", help="Path to a file with one blog topic per line")
     parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
     args = parser.parse_args()
     
     pipeline = BlogPipeline(args.config)
+    
+    if args.topics:
+        with open(args.topics, 'r') as f:
+            topics = [line.strip() for line in f if line.strip()]
+        results = pipeline.run_many(topics)
+        _print_json(results)
+        return 0 if all(r["status"] == "success" for r in results.values()) else 1
+    
     result = pipeline.run(args.topic)
     
-    print(json.dumps(result, indent=2))
+    _print_json(result)
     return 0 if result["status"] == "success" else 1
 
 if __name__ == "__main__":